@@ -346,15 +346,18 @@ class L3AgentSchedulerDbMixin(l3agentscheduler.L3AgentSchedulerPluginBase,
             return []
         record_objs = rb_obj.RouterL3AgentBinding.get_objects(
                 context, router_id=router_ids)
+        if not record_objs:
+            return []
+        # fetch all the hosting agents at once rather than one per binding
+        filters = {'id': [obj.l3_agent_id for obj in record_objs]}
         if admin_state_up is not None:
-            l3_agents = ag_obj.Agent.get_objects(context,
-                     id=[obj.l3_agent_id for obj in record_objs],
-                     admin_state_up=admin_state_up)
-        else:
-            l3_agents = [
-                ag_obj.Agent.get_object(context, id=obj.l3_agent_id)
-                for obj in record_objs
-            ]
+            filters['admin_state_up'] = admin_state_up
+        l3_agents = ag_obj.Agent.get_objects(context, **filters)
+        if admin_state_up is None:
+            # keep returning one agent per binding when not filtering
+            agents = {agent.id: agent for agent in l3_agents}
+            l3_agents = [agents[obj.l3_agent_id] for obj in record_objs
+                         if obj.l3_agent_id in agents]
         if active is not None:
             l3_agents = [l3_agent for l3_agent in
                          l3_agents if not
@@ -62,14 +62,10 @@ class SubnetRequest(object):
             self._gateway_ip = netaddr.IPAddress(gateway_ip)
 
         if allocation_pools is not None:
-            allocation_pools = sorted(allocation_pools)
-            previous = None
             for pool in allocation_pools:
                 if not isinstance(pool, netaddr.ip.IPRange):
                     raise TypeError(_("Ranges must be netaddr.IPRange"))
-                if previous and pool.first <= previous.last:
-                    raise ValueError(_("Ranges must not overlap"))
-                previous = pool
+            allocation_pools = sorted(allocation_pools)
             if 1 < len(allocation_pools):
                 # Checks that all the ranges are in the same IP version.
                 # IPRange sorts first by ip version so we can get by with just
@@ -80,6 +76,13 @@ class SubnetRequest(object):
                 if first_version != last_version:
                     raise ValueError(_("Ranges must be in the same IP "
                                        "version"))
+            # Once sorted, a range can only overlap the one right before it,
+            # so a single pass is enough to detect any overlap.
+            previous = None
+            for pool in allocation_pools:
+                if previous and pool.first <= previous.last:
+                    raise ValueError(_("Ranges must not overlap"))
+                previous = pool
             self._allocation_pools = allocation_pools
 
         if self.gateway_ip and self.allocation_pools:
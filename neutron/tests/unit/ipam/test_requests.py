@@ -27,6 +27,16 @@ from neutron.tests.unit.ipam import fake_driver
 
 FAKE_IPAM_CLASS = 'neutron.tests.unit.ipam.fake_driver.FakeDriver'
 
+# SubnetRequest sorts a copy of the pools it is given, so these can be
+# shared by the tests below.
+ALLOCATION_POOLS = [netaddr.IPRange('1.2.3.4', '1.2.3.5'),
+                    netaddr.IPRange('1.2.3.7', '1.2.3.9')]
+MIXED_VERSION_POOLS = [netaddr.IPRange('0.0.0.1', '0.0.0.2'),
+                       netaddr.IPRange('::1', '::2')]
+OVERLAPPING_POOLS = [netaddr.IPRange('0.0.0.10', '0.0.0.20'),
+                     netaddr.IPRange('0.0.0.8', '0.0.0.10')]
+SPECIFIC_CIDR = netaddr.IPNetwork('1.2.3.0/24')
+
 
 class IpamSubnetRequestTestCase(base.BaseTestCase):
 
@@ -60,12 +70,10 @@ class TestIpamSubnetRequests(IpamSubnetRequestTestCase):
                           gateway_ip='1.2.3.')
 
     def test_subnet_request_with_range(self):
-        allocation_pools = [netaddr.IPRange('1.2.3.4', '1.2.3.5'),
-                            netaddr.IPRange('1.2.3.7', '1.2.3.9')]
         request = ipam_req.SubnetRequest(self.tenant_id,
                                      self.subnet_id,
-                                     allocation_pools=allocation_pools)
-        self.assertEqual(allocation_pools, request.allocation_pools)
+                                     allocation_pools=ALLOCATION_POOLS)
+        self.assertEqual(ALLOCATION_POOLS, request.allocation_pools)
 
     def test_subnet_request_range_not_list(self):
         self.assertRaises(TypeError,
@@ -82,23 +90,39 @@ class TestIpamSubnetRequests(IpamSubnetRequestTestCase):
                           allocation_pools=['1.2.3.4'])
 
     def test_subnet_request_different_versions(self):
-        pools = [netaddr.IPRange('0.0.0.1', '0.0.0.2'),
-                 netaddr.IPRange('::1', '::2')]
+        # ::1 and 0.0.0.1 share the same integer value, the version
+        # mismatch must be reported rather than an overlap
+        e = self.assertRaises(ValueError,
+                              ipam_req.SubnetRequest,
+                              self.tenant_id,
+                              self.subnet_id,
+                              allocation_pools=MIXED_VERSION_POOLS)
+        self.assertIn('same IP version', str(e))
+
+    def test_subnet_request_overlap(self):
         self.assertRaises(ValueError,
                           ipam_req.SubnetRequest,
                           self.tenant_id,
                           self.subnet_id,
-                          allocation_pools=pools)
+                          allocation_pools=OVERLAPPING_POOLS)
 
-    def test_subnet_request_overlap(self):
+    def test_subnet_request_overlap_not_adjacent(self):
         pools = [netaddr.IPRange('0.0.0.10', '0.0.0.20'),
-                 netaddr.IPRange('0.0.0.8', '0.0.0.10')]
+                 netaddr.IPRange('0.0.0.30', '0.0.0.40'),
+                 netaddr.IPRange('0.0.0.15', '0.0.0.16')]
         self.assertRaises(ValueError,
                           ipam_req.SubnetRequest,
                           self.tenant_id,
                           self.subnet_id,
                           allocation_pools=pools)
 
+    def test_subnet_request_many_ranges(self):
+        pools = [netaddr.IPRange(i * 4, i * 4 + 2) for i in range(1000)]
+        request = ipam_req.SubnetRequest(self.tenant_id,
+                                         self.subnet_id,
+                                         allocation_pools=pools[::-1])
+        self.assertEqual(pools, request.allocation_pools)
+
 
 class TestIpamAnySubnetRequest(IpamSubnetRequestTestCase):
 
@@ -170,7 +194,7 @@ class TestIpamSpecificSubnetRequest(IpamSubnetRequestTestCase):
                                              gateway_ip='1.2.3.1')
         self.assertEqual(24, request.prefixlen)
         self.assertEqual(netaddr.IPAddress('1.2.3.1'), request.gateway_ip)
-        self.assertEqual(netaddr.IPNetwork('1.2.3.0/24'), request.subnet_cidr)
+        self.assertEqual(SPECIFIC_CIDR, request.subnet_cidr)
 
     def test_subnet_request_gateway(self):
         request = ipam_req.SpecificSubnetRequest(self.tenant_id,
@@ -187,16 +211,10 @@ class TestAddressRequest(base.BaseTestCase):
 
     EUI64 = ipam_req.AutomaticAddressRequest.EUI64
 
-    def setUp(self):
-        super(TestAddressRequest, self).setUp()
-
-    def test_specific_address_ipv6(self):
-        request = ipam_req.SpecificAddressRequest('2000::45')
-        self.assertEqual(netaddr.IPAddress('2000::45'), request.address)
-
-    def test_specific_address_ipv4(self):
-        request = ipam_req.SpecificAddressRequest('1.2.3.32')
-        self.assertEqual(netaddr.IPAddress('1.2.3.32'), request.address)
+    def test_specific_address(self):
+        for address in ('2000::45', '1.2.3.32'):
+            request = ipam_req.SpecificAddressRequest(address)
+            self.assertEqual(netaddr.IPAddress(address), request.address)
 
     def test_any_address(self):
         ipam_req.AnyAddressRequest()
@@ -27,7 +27,6 @@ from neutron.objects import router as l3_objs
 from neutron.plugins.ml2.drivers.l2pop import db as l2pop_db
 from neutron.plugins.ml2 import models
 from neutron.tests.common import helpers
-from neutron.tests import tools
 from neutron.tests.unit import testlib_api
 
 HOST = helpers.HOST
@@ -39,6 +38,7 @@ TEST_ROUTER_ID = uuidutils.generate_uuid()
 TEST_NETWORK_ID = uuidutils.generate_uuid()
 TEST_HA_NETWORK_ID = uuidutils.generate_uuid()
 PLUGIN_NAME = 'ml2'
+MAC_PREFIX = 'fa:16:3e:00:00:00'.split(':')
 
 
 class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
@@ -70,14 +70,53 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
         with self.ctx.session.begin(subtransactions=True):
             network_obj.Network(self.ctx, id=TEST_HA_NETWORK_ID).create()
             self._create_router(distributed=distributed, ha=True)
-            for state, host in [(n_const.HA_ROUTER_STATE_ACTIVE, HOST),
-                                (n_const.HA_ROUTER_STATE_STANDBY, HOST_2)]:
-                self._setup_port_binding(
-                    network_id=TEST_HA_NETWORK_ID,
-                    device_owner=constants.DEVICE_OWNER_ROUTER_HA_INTF,
-                    device_id=TEST_ROUTER_ID,
-                    host_state=state,
-                    host=host)
+            self._setup_ha_port_bindings(
+                [(n_const.HA_ROUTER_STATE_ACTIVE, HOST),
+                 (n_const.HA_ROUTER_STATE_STANDBY, HOST_2)])
+
+    def _setup_ha_port_bindings(self, states_hosts):
+        port_ids = [uuidutils.generate_uuid() for _ in states_hosts]
+        ports = [self._make_port(
+            port_id, TEST_HA_NETWORK_ID,
+            device_owner=constants.DEVICE_OWNER_ROUTER_HA_INTF,
+            device_id=TEST_ROUTER_ID)
+            for port_id in port_ids]
+        port_bindings = [{'port_id': port_id,
+                          'host': host,
+                          'vif_type': portbindings.VIF_TYPE_UNBOUND,
+                          'vnic_type': portbindings.VNIC_NORMAL}
+                         for port_id, (_state, host)
+                         in zip(port_ids, states_hosts)]
+        ha_port_bindings = [{'port_id': port_id,
+                             'router_id': TEST_ROUTER_ID,
+                             'l3_agent_id':
+                                 self.get_l3_agent_by_host(host)['id'],
+                             'state': state}
+                            for port_id, (state, host)
+                            in zip(port_ids, states_hosts)]
+        # The caller already holds a transaction, don't open a nested one.
+        # Ports are added through the ORM so that their standard attributes
+        # get created, the bindings are inserted in bulk.
+        self.ctx.session.add_all(ports)
+        self.ctx.session.flush()
+        self.ctx.session.bulk_insert_mappings(models.PortBinding,
+                                              port_bindings)
+        self.ctx.session.bulk_insert_mappings(
+            l3ha_model.L3HARouterAgentPortBinding, ha_port_bindings)
+
+    def _make_port(self, port_id, network_id, device_owner='',
+                   device_id=''):
+        return models_v2.Port(
+            id=port_id, network_id=network_id,
+            mac_address=net.get_random_mac(MAC_PREFIX),
+            admin_state_up=True, status=constants.PORT_STATUS_ACTIVE,
+            device_id=device_id, device_owner=device_owner)
+
+    def _register_agents(self):
+        # Register a L2 agent + A bunch of other agents on the same host
+        helpers.register_l3_agent()
+        helpers.register_dhcp_agent()
+        helpers.register_ovs_agent()
 
     def get_l3_agent_by_host(self, agent_host):
         plugin = helpers.FakePlugin()
@@ -85,9 +124,7 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
             self.ctx, constants.AGENT_TYPE_L3, agent_host)
 
     def test_get_agent_by_host(self):
-        helpers.register_l3_agent()
-        helpers.register_dhcp_agent()
-        helpers.register_ovs_agent()
+        self._register_agents()
         agent = l2pop_db.get_agent_by_host(
             self.ctx.session, helpers.HOST)
         self.assertEqual(constants.AGENT_TYPE_OVS, agent.agent_type)
@@ -99,23 +136,22 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
             self.ctx.session, helpers.HOST)
         self.assertIsNone(agent)
 
-    def _setup_port_binding(self, **kwargs):
+    def _setup_port_binding(self, device_owner='', device_id=''):
+        # Keep the pure-Python work out of the transaction.
+        port_id = uuidutils.generate_uuid()
+        port = self._make_port(port_id, TEST_NETWORK_ID,
+                               device_owner=device_owner,
+                               device_id=device_id)
+
         with self.ctx.session.begin(subtransactions=True):
-            mac = net.get_random_mac('fa:16:3e:00:00:00'.split(':'))
-            port_id = uuidutils.generate_uuid()
-            network_id = kwargs.get('network_id', TEST_NETWORK_ID)
-            device_owner = kwargs.get('device_owner', '')
-            device_id = kwargs.get('device_id', '')
-            host = kwargs.get('host', helpers.HOST)
-
-            self.ctx.session.add(models_v2.Port(
-                id=port_id, network_id=network_id, mac_address=mac,
-                admin_state_up=True, status=constants.PORT_STATUS_ACTIVE,
-                device_id=device_id, device_owner=device_owner))
+            self.ctx.session.add(port)
+            # The port needs the ORM to get its standard attributes, flush
+            # it before bulk inserting the rows that reference it.
+            self.ctx.session.flush()
 
             port_binding_cls = models.PortBinding
             binding_kwarg = {'port_id': port_id,
-                             'host': host,
+                             'host': helpers.HOST,
                              'vif_type': portbindings.VIF_TYPE_UNBOUND,
                              'vnic_type': portbindings.VNIC_NORMAL}
 
@@ -124,25 +160,13 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
                 binding_kwarg['router_id'] = TEST_ROUTER_ID
                 binding_kwarg['status'] = constants.PORT_STATUS_DOWN
 
-            self.ctx.session.add(port_binding_cls(**binding_kwarg))
-
-            if network_id == TEST_HA_NETWORK_ID:
-                agent = self.get_l3_agent_by_host(host)
-                haport_bindings_cls = l3ha_model.L3HARouterAgentPortBinding
-                habinding_kwarg = {'port_id': port_id,
-                                   'router_id': device_id,
-                                   'l3_agent_id': agent['id'],
-                                   'state': kwargs.get('host_state',
-                                       n_const.HA_ROUTER_STATE_ACTIVE)}
-                self.ctx.session.add(haport_bindings_cls(**habinding_kwarg))
+            self.ctx.session.bulk_insert_mappings(port_binding_cls,
+                                                  [binding_kwarg])
 
     def test_get_distributed_active_network_ports(self):
         self._setup_port_binding(
             device_owner=constants.DEVICE_OWNER_DVR_INTERFACE)
-        # Register a L2 agent + A bunch of other agents on the same host
-        helpers.register_l3_agent()
-        helpers.register_dhcp_agent()
-        helpers.register_ovs_agent()
+        self._register_agents()
         tunnel_network_ports = l2pop_db.get_distributed_active_network_ports(
             self.ctx.session, TEST_NETWORK_ID)
         self.assertEqual(1, len(tunnel_network_ports))
@@ -160,11 +184,8 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
         self.assertEqual(0, len(tunnel_network_ports))
 
     def test_get_nondistributed_active_network_ports(self):
-        self._setup_port_binding(dvr=False)
-        # Register a L2 agent + A bunch of other agents on the same host
-        helpers.register_l3_agent()
-        helpers.register_dhcp_agent()
-        helpers.register_ovs_agent()
+        self._setup_port_binding()
+        self._register_agents()
         fdb_network_ports = l2pop_db.get_nondistributed_active_network_ports(
             self.ctx.session, TEST_NETWORK_ID)
         self.assertEqual(1, len(fdb_network_ports))
@@ -172,7 +193,7 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
         self.assertEqual(constants.AGENT_TYPE_OVS, agent.agent_type)
 
     def test_get_nondistributed_active_network_ports_no_candidate(self):
-        self._setup_port_binding(dvr=False)
+        self._setup_port_binding()
         # Register a bunch of non-L2 agents on the same host
         helpers.register_l3_agent()
         helpers.register_dhcp_agent()
@@ -181,28 +202,24 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
         self.assertEqual(0, len(fdb_network_ports))
 
     def test__get_ha_router_interface_ids_with_ha_dvr_snat_port(self):
-        helpers.register_dhcp_agent()
-        helpers.register_l3_agent()
-        helpers.register_ovs_agent()
+        self._register_agents()
         self._create_ha_router()
         self._setup_port_binding(
             device_owner=constants.DEVICE_OWNER_ROUTER_SNAT,
             device_id=TEST_ROUTER_ID)
         ha_iface_ids = l2pop_db._get_ha_router_interface_ids(
             self.ctx.session, TEST_NETWORK_ID)
-        self.assertEqual(1, len(list(ha_iface_ids)))
+        self.assertEqual(1, ha_iface_ids.count())
 
     def test__get_ha_router_interface_ids_with_ha_replicated_port(self):
-        helpers.register_dhcp_agent()
-        helpers.register_l3_agent()
-        helpers.register_ovs_agent()
+        self._register_agents()
         self._create_ha_router()
         self._setup_port_binding(
             device_owner=constants.DEVICE_OWNER_HA_REPLICATED_INT,
             device_id=TEST_ROUTER_ID)
         ha_iface_ids = l2pop_db._get_ha_router_interface_ids(
             self.ctx.session, TEST_NETWORK_ID)
-        self.assertEqual(1, len(list(ha_iface_ids)))
+        self.assertEqual(1, ha_iface_ids.count())
 
     def test__get_ha_router_interface_ids_with_no_ha_port(self):
         self._create_router()
@@ -211,29 +228,24 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
             device_id=TEST_ROUTER_ID)
         ha_iface_ids = l2pop_db._get_ha_router_interface_ids(
             self.ctx.session, TEST_NETWORK_ID)
-        self.assertEqual(0, len(list(ha_iface_ids)))
+        self.assertEqual(0, ha_iface_ids.count())
 
     def test_active_network_ports_with_dvr_snat_port(self):
         # Test to get agent hosting dvr snat port
-        helpers.register_l3_agent()
-        helpers.register_dhcp_agent()
-        helpers.register_ovs_agent()
+        self._register_agents()
         # create DVR router
         self._create_router()
         # setup DVR snat port
         self._setup_port_binding(
             device_owner=constants.DEVICE_OWNER_ROUTER_SNAT,
             device_id=TEST_ROUTER_ID)
-        helpers.register_dhcp_agent()
         fdb_network_ports = l2pop_db.get_nondistributed_active_network_ports(
             self.ctx.session, TEST_NETWORK_ID)
         self.assertEqual(1, len(fdb_network_ports))
 
     def test_active_network_ports_with_ha_dvr_snat_port(self):
         # test to get HA agents hosting HA+DVR snat port
-        helpers.register_dhcp_agent()
-        helpers.register_l3_agent()
-        helpers.register_ovs_agent()
+        self._register_agents()
         # create HA+DVR router
         self._create_ha_router()
         # setup HA snat port
@@ -248,14 +260,11 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
         self.assertEqual(2, len(ha_ports))
 
     def test_active_port_count_with_dvr_snat_port(self):
-        helpers.register_l3_agent()
-        helpers.register_dhcp_agent()
-        helpers.register_ovs_agent()
+        self._register_agents()
         self._create_router()
         self._setup_port_binding(
             device_owner=constants.DEVICE_OWNER_ROUTER_SNAT,
             device_id=TEST_ROUTER_ID)
-        helpers.register_dhcp_agent()
         port_count = l2pop_db.get_agent_network_active_port_count(
             self.ctx.session, HOST, TEST_NETWORK_ID)
         self.assertEqual(1, port_count)
@@ -264,9 +273,7 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
         self.assertEqual(0, port_count)
 
     def test_active_port_count_with_ha_dvr_snat_port(self):
-        helpers.register_dhcp_agent()
-        helpers.register_l3_agent()
-        helpers.register_ovs_agent()
+        self._register_agents()
         self._create_ha_router()
         self._setup_port_binding(
             device_owner=constants.DEVICE_OWNER_ROUTER_SNAT,
@@ -279,9 +286,7 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
         self.assertEqual(1, port_count)
 
     def test_get_ha_agents_by_router_id(self):
-        helpers.register_dhcp_agent()
-        helpers.register_l3_agent()
-        helpers.register_ovs_agent()
+        self._register_agents()
         self._create_ha_router()
         self._setup_port_binding(
             device_owner=constants.DEVICE_OWNER_ROUTER_SNAT,
@@ -289,4 +294,5 @@ class TestL2PopulationDBTestCase(testlib_api.SqlTestCase):
         agents = l2pop_db.get_ha_agents_by_router_id(
             self.ctx.session, TEST_ROUTER_ID)
         ha_agents = [agent.host for agent in agents]
-        self.assertEqual(tools.UnorderedList([HOST, HOST_2]), ha_agents)
+        self.assertEqual(2, len(ha_agents))
+        self.assertEqual({HOST, HOST_2}, set(ha_agents))
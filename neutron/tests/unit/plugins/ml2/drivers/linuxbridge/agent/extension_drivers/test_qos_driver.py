@@ -32,19 +32,48 @@ DSCP_VALUE = 32
 
 class QosLinuxbridgeAgentDriverTestCase(base.BaseTestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        super(QosLinuxbridgeAgentDriverTestCase, cls).setUpClass()
+        # None of the tests modify the rules or the port, so build them
+        # only once for the whole class.
+        cls._rule_egress_bw_limit = cls._create_bw_limit_rule_obj(
+            constants.EGRESS_DIRECTION)
+        cls._rule_ingress_bw_limit = cls._create_bw_limit_rule_obj(
+            constants.INGRESS_DIRECTION)
+        cls._rule_dscp_marking = cls._create_dscp_marking_rule_obj()
+        cls._port = cls._create_fake_port(uuidutils.generate_uuid())
+
     def setUp(self):
         super(QosLinuxbridgeAgentDriverTestCase, self).setUp()
+        # The override is dropped by the CONF.reset cleanup of the base
+        # test case, so it has to be set again for every test.
         cfg.CONF.set_override("tbf_latency", TEST_LATENCY_VALUE, "QOS")
         self.qos_driver = qos_driver.QosLinuxbridgeAgentDriver()
         self.qos_driver.initialize()
-        self.rule_egress_bw_limit = self._create_bw_limit_rule_obj(
-            constants.EGRESS_DIRECTION)
-        self.rule_ingress_bw_limit = self._create_bw_limit_rule_obj(
-            constants.INGRESS_DIRECTION)
-        self.rule_dscp_marking = self._create_dscp_marking_rule_obj()
-        self.port = self._create_fake_port(uuidutils.generate_uuid())
-
-    def _create_bw_limit_rule_obj(self, direction):
+        self.rule_egress_bw_limit = self._rule_egress_bw_limit
+        self.rule_ingress_bw_limit = self._rule_ingress_bw_limit
+        self.rule_dscp_marking = self._rule_dscp_marking
+        self.port = self._port
+        # MagicMock, since the driver enters iptables_manager.defer_apply()
+        self.iptables_manager = mock.MagicMock(ipv4={'mangle': mock.Mock()},
+                                               ipv6={'mangle': mock.Mock()})
+        self.qos_driver.iptables_manager = self.iptables_manager
+        self.mock_set_filters_bw_limit = mock.patch.object(
+            tc_lib.TcCommand, "set_filters_bw_limit").start()
+        self.mock_set_tbf_bw_limit = mock.patch.object(
+            tc_lib.TcCommand, "set_tbf_bw_limit").start()
+        self.mock_update_filters_bw_limit = mock.patch.object(
+            tc_lib.TcCommand, "update_filters_bw_limit").start()
+        self.mock_update_tbf_bw_limit = mock.patch.object(
+            tc_lib.TcCommand, "update_tbf_bw_limit").start()
+        self.mock_delete_filters_bw_limit = mock.patch.object(
+            tc_lib.TcCommand, "delete_filters_bw_limit").start()
+        self.mock_delete_tbf_bw_limit = mock.patch.object(
+            tc_lib.TcCommand, "delete_tbf_bw_limit").start()
+
+    @staticmethod
+    def _create_bw_limit_rule_obj(direction):
         rule_obj = rule.QosBandwidthLimitRule()
         rule_obj.id = uuidutils.generate_uuid()
         rule_obj.max_kbps = 2
@@ -53,14 +82,16 @@ class QosLinuxbridgeAgentDriverTestCase(base.BaseTestCase):
         rule_obj.obj_reset_changes()
         return rule_obj
 
-    def _create_dscp_marking_rule_obj(self):
+    @staticmethod
+    def _create_dscp_marking_rule_obj():
         rule_obj = rule.QosDscpMarkingRule()
         rule_obj.id = uuidutils.generate_uuid()
         rule_obj.dscp_mark = DSCP_VALUE
         rule_obj.obj_reset_changes()
         return rule_obj
 
-    def _create_fake_port(self, policy_id):
+    @staticmethod
+    def _create_fake_port(policy_id):
         return {'qos_policy_id': policy_id,
                 'network_qos_policy_id': None,
                 'device': 'fake_tap'}
@@ -78,170 +109,122 @@ class QosLinuxbridgeAgentDriverTestCase(base.BaseTestCase):
     def _dscp_rule_tag(self, device):
         return "dscp-%s" % device
 
+    def _dscp_get_chain_calls(self, dscp_chain_name):
+        return [mock.call("mangle", dscp_chain_name, ip_version=4),
+                mock.call("mangle", dscp_chain_name, ip_version=6)]
+
     def test_create_egress_bandwidth_limit(self):
-        with mock.patch.object(
-            tc_lib.TcCommand, "set_filters_bw_limit"
-        ) as set_filters_bw_limit, mock.patch.object(
-            tc_lib.TcCommand, "set_tbf_bw_limit"
-        ) as set_tbf_limit:
-            self.qos_driver.create_bandwidth_limit(self.port,
-                                                   self.rule_egress_bw_limit)
-            set_filters_bw_limit.assert_called_once_with(
-                self.rule_egress_bw_limit.max_kbps,
-                self.rule_egress_bw_limit.max_burst_kbps,
-            )
-            set_tbf_limit.assert_not_called()
+        self.qos_driver.create_bandwidth_limit(self.port,
+                                               self.rule_egress_bw_limit)
+        self.mock_set_filters_bw_limit.assert_called_once_with(
+            self.rule_egress_bw_limit.max_kbps,
+            self.rule_egress_bw_limit.max_burst_kbps,
+        )
+        self.mock_set_tbf_bw_limit.assert_not_called()
 
     def test_create_ingress_bandwidth_limit(self):
-        with mock.patch.object(
-            tc_lib.TcCommand, "set_filters_bw_limit"
-        ) as set_filters_bw_limit, mock.patch.object(
-            tc_lib.TcCommand, "set_tbf_bw_limit"
-        ) as set_tbf_limit:
-            self.qos_driver.create_bandwidth_limit(self.port,
-                                                   self.rule_ingress_bw_limit)
-            set_filters_bw_limit.assert_not_called()
-            set_tbf_limit.assert_called_once_with(
-                self.rule_ingress_bw_limit.max_kbps,
-                self.rule_ingress_bw_limit.max_burst_kbps,
-                TEST_LATENCY_VALUE
-            )
+        self.qos_driver.create_bandwidth_limit(self.port,
+                                               self.rule_ingress_bw_limit)
+        self.mock_set_filters_bw_limit.assert_not_called()
+        self.mock_set_tbf_bw_limit.assert_called_once_with(
+            self.rule_ingress_bw_limit.max_kbps,
+            self.rule_ingress_bw_limit.max_burst_kbps,
+            TEST_LATENCY_VALUE
+        )
 
     def test_update_egress_bandwidth_limit(self):
-        with mock.patch.object(
-            tc_lib.TcCommand, "update_filters_bw_limit"
-        ) as update_filters_bw_limit, mock.patch.object(
-            tc_lib.TcCommand, "update_tbf_bw_limit"
-        ) as update_tbf_bw_limit:
-            self.qos_driver.update_bandwidth_limit(self.port,
-                                                   self.rule_egress_bw_limit)
-            update_filters_bw_limit.assert_called_once_with(
-                self.rule_egress_bw_limit.max_kbps,
-                self.rule_egress_bw_limit.max_burst_kbps,
-            )
-            update_tbf_bw_limit.assert_not_called()
+        self.qos_driver.update_bandwidth_limit(self.port,
+                                               self.rule_egress_bw_limit)
+        self.mock_update_filters_bw_limit.assert_called_once_with(
+            self.rule_egress_bw_limit.max_kbps,
+            self.rule_egress_bw_limit.max_burst_kbps,
+        )
+        self.mock_update_tbf_bw_limit.assert_not_called()
 
     def test_update_ingress_bandwidth_limit(self):
-        with mock.patch.object(
-            tc_lib.TcCommand, "update_filters_bw_limit"
-        ) as update_filters_bw_limit, mock.patch.object(
-            tc_lib.TcCommand, "update_tbf_bw_limit"
-        ) as update_tbf_bw_limit:
-            self.qos_driver.update_bandwidth_limit(self.port,
-                                                   self.rule_ingress_bw_limit)
-            update_filters_bw_limit.assert_not_called()
-            update_tbf_bw_limit.assert_called_once_with(
-                self.rule_egress_bw_limit.max_kbps,
-                self.rule_egress_bw_limit.max_burst_kbps,
-                TEST_LATENCY_VALUE
-            )
+        self.qos_driver.update_bandwidth_limit(self.port,
+                                               self.rule_ingress_bw_limit)
+        self.mock_update_filters_bw_limit.assert_not_called()
+        self.mock_update_tbf_bw_limit.assert_called_once_with(
+            self.rule_egress_bw_limit.max_kbps,
+            self.rule_egress_bw_limit.max_burst_kbps,
+            TEST_LATENCY_VALUE
+        )
 
     def test_delete_bandwidth_limit(self):
-        with mock.patch.object(
-            tc_lib.TcCommand, "delete_filters_bw_limit"
-        ) as delete_filters_bw_limit:
-            self.qos_driver.delete_bandwidth_limit(self.port)
-            delete_filters_bw_limit.assert_called_once_with()
+        self.qos_driver.delete_bandwidth_limit(self.port)
+        self.mock_delete_filters_bw_limit.assert_called_once_with()
 
     def test_delete_ingress_bandwidth_limit(self):
-        with mock.patch.object(
-            tc_lib.TcCommand, "delete_tbf_bw_limit"
-        ) as delete_tbf_bw_limit:
-            self.qos_driver.delete_bandwidth_limit_ingress(self.port)
-            delete_tbf_bw_limit.assert_called_once_with()
+        self.qos_driver.delete_bandwidth_limit_ingress(self.port)
+        self.mock_delete_tbf_bw_limit.assert_called_once_with()
 
     def test_create_dscp_marking(self):
+        device = self.port['device']
+        dscp_chain_name = self._dscp_mark_chain_name(device)
+        dscp_rule_tag = self._dscp_rule_tag(device)
         expected_calls = [
-            mock.call.add_chain(
-                self._dscp_mark_chain_name(self.port['device'])),
+            mock.call.add_chain(dscp_chain_name),
             mock.call.add_rule(
-                "POSTROUTING",
-                self._dscp_postrouting_rule(self.port['device'])),
+                "POSTROUTING", self._dscp_postrouting_rule(device)),
             mock.call.add_rule(
-                self._dscp_mark_chain_name(self.port['device']),
+                dscp_chain_name,
                 self._dscp_rule(DSCP_VALUE),
-                tag=self._dscp_rule_tag(self.port['device'])
+                tag=dscp_rule_tag
             )
         ]
-        with mock.patch.object(
-            self.qos_driver, "iptables_manager") as iptables_manager:
-
-            iptables_manager.ip4['mangle'] = mock.Mock()
-            iptables_manager.ip6['mangle'] = mock.Mock()
-            self.qos_driver.create_dscp_marking(
-                self.port, self.rule_dscp_marking)
-            iptables_manager.ipv4['mangle'].assert_has_calls(expected_calls)
-            iptables_manager.ipv6['mangle'].assert_has_calls(expected_calls)
+        self.qos_driver.create_dscp_marking(
+            self.port, self.rule_dscp_marking)
+        self.iptables_manager.ipv4['mangle'].assert_has_calls(expected_calls)
+        self.iptables_manager.ipv6['mangle'].assert_has_calls(expected_calls)
 
     def test_update_dscp_marking(self):
+        device = self.port['device']
+        dscp_chain_name = self._dscp_mark_chain_name(device)
+        dscp_rule_tag = self._dscp_rule_tag(device)
         expected_calls = [
-            mock.call.clear_rules_by_tag(
-                self._dscp_rule_tag(self.port['device'])),
-            mock.call.add_chain(
-                self._dscp_mark_chain_name(self.port['device'])),
+            mock.call.clear_rules_by_tag(dscp_rule_tag),
+            mock.call.add_chain(dscp_chain_name),
             mock.call.add_rule(
-                "POSTROUTING",
-                self._dscp_postrouting_rule(self.port['device'])),
+                "POSTROUTING", self._dscp_postrouting_rule(device)),
             mock.call.add_rule(
-                self._dscp_mark_chain_name(self.port['device']),
+                dscp_chain_name,
                 self._dscp_rule(DSCP_VALUE),
-                tag=self._dscp_rule_tag(self.port['device'])
+                tag=dscp_rule_tag
             )
         ]
-        with mock.patch.object(
-            self.qos_driver, "iptables_manager") as iptables_manager:
-
-            iptables_manager.ip4['mangle'] = mock.Mock()
-            iptables_manager.ip6['mangle'] = mock.Mock()
-            self.qos_driver.update_dscp_marking(
-                self.port, self.rule_dscp_marking)
-            iptables_manager.ipv4['mangle'].assert_has_calls(expected_calls)
-            iptables_manager.ipv6['mangle'].assert_has_calls(expected_calls)
+        self.qos_driver.update_dscp_marking(
+            self.port, self.rule_dscp_marking)
+        self.iptables_manager.ipv4['mangle'].assert_has_calls(expected_calls)
+        self.iptables_manager.ipv6['mangle'].assert_has_calls(expected_calls)
 
     def test_delete_dscp_marking_chain_empty(self):
-        dscp_chain_name = self._dscp_mark_chain_name(self.port['device'])
+        device = self.port['device']
+        dscp_chain_name = self._dscp_mark_chain_name(device)
         expected_calls = [
-            mock.call.clear_rules_by_tag(
-                self._dscp_rule_tag(self.port['device'])),
-            mock.call.remove_chain(
-                dscp_chain_name),
+            mock.call.clear_rules_by_tag(self._dscp_rule_tag(device)),
+            mock.call.remove_chain(dscp_chain_name),
             mock.call.remove_rule(
-                "POSTROUTING",
-                self._dscp_postrouting_rule(self.port['device']))
+                "POSTROUTING", self._dscp_postrouting_rule(device))
         ]
-        with mock.patch.object(
-            self.qos_driver, "iptables_manager") as iptables_manager:
-
-            iptables_manager.ip4['mangle'] = mock.Mock()
-            iptables_manager.ip6['mangle'] = mock.Mock()
-            iptables_manager.get_chain = mock.Mock(return_value=[])
-            self.qos_driver.delete_dscp_marking(self.port)
-            iptables_manager.ipv4['mangle'].assert_has_calls(expected_calls)
-            iptables_manager.ipv6['mangle'].assert_has_calls(expected_calls)
-            iptables_manager.get_chain.assert_has_calls([
-                mock.call("mangle", dscp_chain_name, ip_version=4),
-                mock.call("mangle", dscp_chain_name, ip_version=6)
-            ])
+        self.iptables_manager.get_chain.return_value = []
+        self.qos_driver.delete_dscp_marking(self.port)
+        self.iptables_manager.ipv4['mangle'].assert_has_calls(expected_calls)
+        self.iptables_manager.ipv6['mangle'].assert_has_calls(expected_calls)
+        self.iptables_manager.get_chain.assert_has_calls(
+            self._dscp_get_chain_calls(dscp_chain_name))
 
     def test_delete_dscp_marking_chain_not_empty(self):
-        dscp_chain_name = self._dscp_mark_chain_name(self.port['device'])
+        device = self.port['device']
+        dscp_chain_name = self._dscp_mark_chain_name(device)
         expected_calls = [
-            mock.call.clear_rules_by_tag(
-                self._dscp_rule_tag(self.port['device'])),
+            mock.call.clear_rules_by_tag(self._dscp_rule_tag(device)),
         ]
-        with mock.patch.object(
-            self.qos_driver, "iptables_manager") as iptables_manager:
-
-            iptables_manager.ip4['mangle'] = mock.Mock()
-            iptables_manager.ip6['mangle'] = mock.Mock()
-            iptables_manager.get_chain = mock.Mock(
-                return_value=["some other rule"])
-            self.qos_driver.delete_dscp_marking(self.port)
-            iptables_manager.ipv4['mangle'].assert_has_calls(expected_calls)
-            iptables_manager.ipv6['mangle'].assert_has_calls(expected_calls)
-            iptables_manager.get_chain.assert_has_calls([
-                mock.call("mangle", dscp_chain_name, ip_version=4),
-                mock.call("mangle", dscp_chain_name, ip_version=6)
-            ])
-            iptables_manager.ipv4['mangle'].remove_chain.assert_not_called()
-            iptables_manager.ipv4['mangle'].remove_rule.assert_not_called()
+        self.iptables_manager.get_chain.return_value = ["some other rule"]
+        self.qos_driver.delete_dscp_marking(self.port)
+        self.iptables_manager.ipv4['mangle'].assert_has_calls(expected_calls)
+        self.iptables_manager.ipv6['mangle'].assert_has_calls(expected_calls)
+        self.iptables_manager.get_chain.assert_has_calls(
+            self._dscp_get_chain_calls(dscp_chain_name))
+        self.iptables_manager.ipv4['mangle'].remove_chain.assert_not_called()
+        self.iptables_manager.ipv4['mangle'].remove_rule.assert_not_called()
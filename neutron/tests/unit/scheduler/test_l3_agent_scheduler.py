@@ -24,7 +24,6 @@ from neutron_lib import context as n_context
 from neutron_lib.plugins import constants as plugin_constants
 from neutron_lib.plugins import directory
 from oslo_config import cfg
-from oslo_utils import importutils
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 from sqlalchemy import orm
@@ -63,6 +62,7 @@ HOST_DVR = 'my_l3_host_dvr'
 HOST_DVR_SNAT = 'my_l3_host_dvr_snat'
 DEVICE_OWNER_COMPUTE = constants.DEVICE_OWNER_COMPUTE_PREFIX + 'fake'
 DEVICE_OWNER_COMPUTE_NOVA = constants.DEVICE_OWNER_COMPUTE_PREFIX + 'nova'
+DVR_SUBNET_ID = '80947d4a-fbc8-484b-9f92-623a6bfcf3e0'
 
 
 class FakeL3Scheduler(l3_agent_scheduler.L3Scheduler):
@@ -159,15 +159,15 @@ class L3SchedulerBaseTestCase(base.BaseTestCase):
     def _test__bind_routers_ha(self, has_binding):
         routers = [{'id': 'foo_router', 'ha': True, 'tenant_id': '42'}]
         agent = agent_model.Agent(id='foo_agent')
-        with mock.patch.object(self.scheduler,
-                               '_router_has_binding',
-                               return_value=has_binding) as mock_has_binding,\
-                mock.patch.object(self.scheduler,
-                                  'create_ha_port_and_bind') as mock_bind:
-            self.scheduler._bind_routers(mock.ANY, mock.ANY, routers, agent)
-            mock_has_binding.assert_called_once_with(mock.ANY, 'foo_router',
-                                                     'foo_agent')
-            self.assertEqual(not has_binding, mock_bind.called)
+        mock_has_binding = mock.patch.object(
+            self.scheduler, '_router_has_binding',
+            return_value=has_binding).start()
+        mock_bind = mock.patch.object(
+            self.scheduler, 'create_ha_port_and_bind').start()
+        self.scheduler._bind_routers(mock.ANY, mock.ANY, routers, agent)
+        mock_has_binding.assert_called_once_with(mock.ANY, 'foo_router',
+                                                 'foo_agent')
+        self.assertEqual(not has_binding, mock_bind.called)
 
     def test__bind_routers_ha_has_binding(self):
         self._test__bind_routers_ha(has_binding=True)
@@ -220,6 +220,16 @@ class L3SchedulerBaseMixin(object):
         update = {'agent': {'admin_state_up': state}}
         self.plugin.update_agent(context, agent_id, update)
 
+    def _set_l3_agents_admin_state(self, context, agent_ids, state=True):
+        # Update all the agents with a single statement. Unlike
+        # _set_l3_agent_admin_state() this does not go through the plugin,
+        # so no agent_updated notification is sent.
+        with context.session.begin(subtransactions=True):
+            context.session.query(agent_model.Agent).filter(
+                agent_model.Agent.id.in_(agent_ids)).update(
+                    {'admin_state_up': state},
+                    synchronize_session='fetch')
+
     def _set_l3_agent_dead(self, agent_id):
         update = {
             'agent': {
@@ -229,10 +239,11 @@ class L3SchedulerBaseMixin(object):
 
     @contextlib.contextmanager
     def router_with_ext_gw(self, name='router1', admin_state_up=True,
-                           fmt=None, tenant_id=uuidutils.generate_uuid(),
+                           fmt=None, tenant_id=None,
                            external_gateway_info=None,
                            subnet=None, set_context=False,
                            **kwargs):
+        tenant_id = tenant_id or uuidutils.generate_uuid()
         router = self._make_router(fmt or self.fmt, tenant_id, name,
                                    admin_state_up, external_gateway_info,
                                    set_context, **kwargs)
@@ -249,6 +260,13 @@ class L3SchedulerBaseMixin(object):
 
 class L3SchedulerTestBaseMixin(object):
 
+    _EXTERNAL_GW_INFO = {'network_id': uuidutils.generate_uuid(),
+                         'enable_snat': True}
+
+    def _mock_get_router(self, router):
+        mock.patch.object(l3_db.L3_NAT_db_mixin, 'get_router',
+                          return_value=router).start()
+
     def _test_add_router_to_l3_agent(self,
                                      distributed=False,
                                      already_scheduled=False,
@@ -266,15 +284,14 @@ class L3SchedulerTestBaseMixin(object):
         router['router']['external_gateway_info'] = external_gw
         if already_scheduled:
             self._test_schedule_bind_router(agent, router)
-        with mock.patch.object(self.plugin,
-                               "validate_agent_router_combination"),\
-                mock.patch.object(self.plugin,
-                                  "create_router_to_agent_binding") as auto_s,\
-                mock.patch('neutron.db.l3_db.L3_NAT_db_mixin.get_router',
-                           return_value=router['router']):
-            self.plugin.add_router_to_l3_agent(self.adminContext, agent_id,
-                                        router['router']['id'])
-            self.assertNotEqual(already_scheduled, auto_s.called)
+        mock.patch.object(self.plugin,
+                          "validate_agent_router_combination").start()
+        auto_s = mock.patch.object(self.plugin,
+                                   "create_router_to_agent_binding").start()
+        self._mock_get_router(router['router'])
+        self.plugin.add_router_to_l3_agent(self.adminContext, agent_id,
+                                           router['router']['id'])
+        self.assertNotEqual(already_scheduled, auto_s.called)
 
     def test__unbind_router_removes_binding(self):
         agent_id = self.agent_id1
@@ -307,13 +324,13 @@ class L3SchedulerTestBaseMixin(object):
                                               expected_exception=None):
         router = self._create_router_for_l3_agent_dvr_test(
             distributed=distributed, external_gw=external_gw)
-        with mock.patch.object(self.plugin, "create_router_to_agent_binding"),\
-                mock.patch('neutron.db.l3_db.L3_NAT_db_mixin.get_router',
-                           return_value=router['router']):
-            self.assertRaises(expected_exception,
-                              self.plugin.add_router_to_l3_agent,
-                              self.adminContext, agent_id,
-                              router['router']['id'])
+        mock.patch.object(self.plugin,
+                          "create_router_to_agent_binding").start()
+        self._mock_get_router(router['router'])
+        self.assertRaises(expected_exception,
+                          self.plugin.add_router_to_l3_agent,
+                          self.adminContext, agent_id,
+                          router['router']['id'])
 
     def test__schedule_router_skips_unschedulable_routers(self):
         mock.patch.object(self.plugin, 'router_supports_scheduling',
@@ -324,7 +341,6 @@ class L3SchedulerTestBaseMixin(object):
                                                      'router_id'))
 
     def test_add_router_to_l3_agent_mismatch_error_dvr_to_legacy(self):
-        self._register_l3_agents()
         self._prepare_l3_agent_dvr_move_exceptions(
             distributed=True,
             agent_id=self.agent_id1,
@@ -344,50 +360,36 @@ class L3SchedulerTestBaseMixin(object):
             expected_exception=l3agent.DVRL3CannotAssignToDvrAgent)
 
     def test_add_router_to_l3_agent_dvr_to_snat(self):
-        external_gw_info = {
-            "network_id": uuidutils.generate_uuid(),
-            "enable_snat": True
-        }
         self._register_l3_dvr_agents()
         agent_id = self.l3_dvr_snat_id
         router = self._create_router_for_l3_agent_dvr_test(
             distributed=True,
-            external_gw=external_gw_info)
-        with mock.patch.object(self.plugin,
-                               "validate_agent_router_combination"),\
-                mock.patch.object(
-                    self.plugin,
-                    "create_router_to_agent_binding") as rtr_agent_binding,\
-                mock.patch('neutron.db.l3_db.L3_NAT_db_mixin.get_router',
-                           return_value=router['router']):
-
-            self.plugin.add_router_to_l3_agent(self.adminContext, agent_id,
-                                        router['router']['id'])
-            rtr_agent_binding.assert_called_once_with(
-                self.adminContext, mock.ANY, router['router'])
+            external_gw=dict(self._EXTERNAL_GW_INFO))
+        mock.patch.object(self.plugin,
+                          "validate_agent_router_combination").start()
+        rtr_agent_binding = mock.patch.object(
+            self.plugin, "create_router_to_agent_binding").start()
+        self._mock_get_router(router['router'])
+
+        self.plugin.add_router_to_l3_agent(self.adminContext, agent_id,
+                                           router['router']['id'])
+        rtr_agent_binding.assert_called_once_with(
+            self.adminContext, mock.ANY, router['router'])
 
     def test_add_router_to_l3_agent(self):
         self._test_add_router_to_l3_agent()
 
     def test_add_distributed_router_to_l3_agent(self):
-        external_gw_info = {
-            "network_id": uuidutils.generate_uuid(),
-            "enable_snat": True
-        }
-        self._test_add_router_to_l3_agent(distributed=True,
-                                          external_gw=external_gw_info)
+        self._test_add_router_to_l3_agent(
+            distributed=True, external_gw=dict(self._EXTERNAL_GW_INFO))
 
     def test_add_router_to_l3_agent_already_scheduled(self):
         self._test_add_router_to_l3_agent(already_scheduled=True)
 
     def test_add_distributed_router_to_l3_agent_already_scheduled(self):
-        external_gw_info = {
-            "network_id": uuidutils.generate_uuid(),
-            "enable_snat": True
-        }
-        self._test_add_router_to_l3_agent(distributed=True,
-                                          already_scheduled=True,
-                                          external_gw=external_gw_info)
+        self._test_add_router_to_l3_agent(
+            distributed=True, already_scheduled=True,
+            external_gw=dict(self._EXTERNAL_GW_INFO))
 
     def test_remove_router_from_l3_agent_in_dvr_mode(self):
         self._register_l3_dvr_agents()
@@ -412,13 +414,12 @@ class L3SchedulerTestBaseMixin(object):
 
     def _prepare_schedule_dvr_tests(self):
         scheduler = l3_agent_scheduler.ChanceScheduler()
-        agent = agent_model.Agent()
-        agent.admin_state_up = True
-        agent.heartbeat_timestamp = timeutils.utcnow()
-        plugin = mock.Mock()
-        plugin.get_l3_agents_hosting_routers.return_value = []
-        plugin.get_l3_agents.return_value = [agent]
-        plugin.get_l3_agent_candidates.return_value = [agent]
+        agent = agent_model.Agent(admin_state_up=True,
+                                  heartbeat_timestamp=timeutils.utcnow())
+        plugin = mock.Mock(**{
+            'get_l3_agents_hosting_routers.return_value': [],
+            'get_l3_agents.return_value': [agent],
+            'get_l3_agent_candidates.return_value': [agent]})
 
         return scheduler, agent, plugin
 
@@ -429,12 +430,11 @@ class L3SchedulerTestBaseMixin(object):
             'distributed': True
         }
         plugin.get_router.return_value = sync_router
-        with mock.patch.object(scheduler, 'bind_router'),\
-                mock.patch.object(plugin,
-                                  'get_snat_bindings',
-                                  return_value=False):
-            scheduler._schedule_router(
-                plugin, self.adminContext, 'foo_router_id', None)
+        mock.patch.object(scheduler, 'bind_router').start()
+        mock.patch.object(plugin, 'get_snat_bindings',
+                          return_value=False).start()
+        scheduler._schedule_router(
+            plugin, self.adminContext, 'foo_router_id', None)
         expected_calls = [
             mock.call.get_router(mock.ANY, 'foo_router_id'),
             mock.call.get_l3_agents_hosting_routers(
@@ -449,10 +449,7 @@ class L3SchedulerTestBaseMixin(object):
         sync_router = {
             'id': 'foo_router_id',
             'distributed': True,
-            'external_gateway_info': {
-                'network_id': uuidutils.generate_uuid(),
-                'enable_snat': True
-            }
+            'external_gateway_info': dict(self._EXTERNAL_GW_INFO)
         }
         plugin.get_router.return_value = sync_router
         with mock.patch.object(scheduler, 'bind_router'):
@@ -476,19 +473,19 @@ class L3SchedulerTestBaseMixin(object):
 
         rid = router['router']['id']
         scheduler.bind_router(self.plugin, ctx, rid, agent.id)
-        results = (session.query(db).filter_by(router_id=rid).all())
-        self.assertGreater(len(results), 0)
-        self.assertIn(agent.id, [bind.l3_agent_id for bind in results])
+        binding = session.query(db.l3_agent_id).filter_by(
+            router_id=rid, l3_agent_id=agent.id).first()
+        self.assertIsNotNone(binding)
 
     def test_bind_new_router(self):
         router = self._make_router(self.fmt,
                                    tenant_id=uuidutils.generate_uuid(),
                                    name='r1')
-        with mock.patch.object(l3_agent_scheduler.LOG, 'debug') as flog:
-            self._test_schedule_bind_router(self.agent1, router)
-            self.assertEqual(1, flog.call_count)
-            args, kwargs = flog.call_args
-            self.assertIn('is scheduled', args[0])
+        flog = mock.patch.object(l3_agent_scheduler.LOG, 'debug').start()
+        self._test_schedule_bind_router(self.agent1, router)
+        self.assertEqual(1, flog.call_count)
+        args, kwargs = flog.call_args
+        self.assertIn('is scheduled', args[0])
 
     def test_bind_absent_router(self):
         scheduler = l3_agent_scheduler.ChanceScheduler()
@@ -501,12 +498,20 @@ class L3SchedulerTestBaseMixin(object):
         router = self._make_router(self.fmt,
                                    tenant_id=uuidutils.generate_uuid(),
                                    name='r2')
+        flog = mock.patch.object(l3_agent_scheduler.LOG, 'debug').start()
+        self._test_schedule_bind_router(self.agent1, router)
+        flog.reset_mock()
         self._test_schedule_bind_router(self.agent1, router)
-        with mock.patch.object(l3_agent_scheduler.LOG, 'debug') as flog:
-            self._test_schedule_bind_router(self.agent1, router)
-            self.assertEqual(1, flog.call_count)
-            args, kwargs = flog.call_args
-            self.assertIn('has already been scheduled', args[0])
+        self.assertEqual(1, flog.call_count)
+        args, kwargs = flog.call_args
+        self.assertIn('has already been scheduled', args[0])
+
+    def _fake_router_dict(self, distributed=False):
+        # get_l3_agent_candidates() only looks at the router dict, there is
+        # no need to create the router in the database.
+        return {'id': uuidutils.generate_uuid(),
+                'distributed': distributed,
+                'external_gateway_info': None}
 
     def _check_get_l3_agent_candidates(
             self, router, agent_list, exp_host, count=1):
@@ -518,109 +523,40 @@ class L3SchedulerTestBaseMixin(object):
 
     def test_get_l3_agent_candidates_legacy(self):
         self._register_l3_dvr_agents()
-        router = self._make_router(self.fmt,
-                                   tenant_id=uuidutils.generate_uuid(),
-                                   name='r2')
-        router['external_gateway_info'] = None
-        router['id'] = uuidutils.generate_uuid()
+        router = self._fake_router_dict()
         agent_list = [self.agent1, self.l3_dvr_agent]
 
         # test legacy agent_mode case: only legacy agent should be candidate
-        router['distributed'] = False
         exp_host = 'host_1'
         self._check_get_l3_agent_candidates(router, agent_list, exp_host)
 
     def test_get_l3_agent_candidates_dvr(self):
         self._register_l3_dvr_agents()
-        router = self._make_router(self.fmt,
-                                   tenant_id=uuidutils.generate_uuid(),
-                                   name='r2')
-        router['external_gateway_info'] = None
-        router['id'] = uuidutils.generate_uuid()
-        agent_list = [self.agent1, self.l3_dvr_agent]
         # test dvr agent_mode case no candidates
-        router['distributed'] = True
-        self.get_subnet_ids_on_router = mock.Mock()
-        self._check_dvr_serviceable_ports_on_host = mock.Mock(
-            return_value=True)
-        self._check_get_l3_agent_candidates(router, agent_list, None, count=0)
-
-    def test_get_l3_agent_candidates_dvr_no_vms(self):
-        self._register_l3_dvr_agents()
-        router = self._make_router(self.fmt,
-                                   tenant_id=uuidutils.generate_uuid(),
-                                   name='r2')
-        router['external_gateway_info'] = None
-        router['id'] = uuidutils.generate_uuid()
+        router = self._fake_router_dict(distributed=True)
         agent_list = [self.agent1, self.l3_dvr_agent]
-        router['distributed'] = True
-        # Test no VMs present case
-        self.get_subnet_ids_on_router = mock.Mock()
-        self._check_dvr_serviceable_ports_on_host = mock.Mock(
-            return_value=False)
-        self._check_get_l3_agent_candidates(
-            router, agent_list, HOST_DVR, count=0)
+        self._check_get_l3_agent_candidates(router, agent_list, None, count=0)
 
     def test_get_l3_agent_candidates_dvr_snat(self):
         self._register_l3_dvr_agents()
-        router = self._make_router(self.fmt,
-                                   tenant_id=uuidutils.generate_uuid(),
-                                   name='r2')
-        router['external_gateway_info'] = None
-        router['id'] = uuidutils.generate_uuid()
-        router['distributed'] = True
+        router = self._fake_router_dict(distributed=True)
 
         agent_list = [self.l3_dvr_snat_agent]
-        self.get_subnet_ids_on_router = mock.Mock()
-        self._check_dvr_serviceable_ports_on_host = mock.Mock(
-            return_value=True)
         self._check_get_l3_agent_candidates(router, agent_list, HOST_DVR_SNAT)
 
-    def test_get_l3_agent_candidates_dvr_snat_no_vms(self):
-        self._register_l3_dvr_agents()
-        router = self._make_router(self.fmt,
-                                   tenant_id=uuidutils.generate_uuid(),
-                                   name='r2')
-        router['external_gateway_info'] = None
-        router['id'] = uuidutils.generate_uuid()
-        router['distributed'] = True
-
-        agent_list = [self.l3_dvr_snat_agent]
-        self._check_dvr_serviceable_ports_on_host = mock.Mock(
-            return_value=False)
-        # Test no VMs present case
-        self.get_subnet_ids_on_router = mock.Mock()
-        self._check_dvr_serviceable_ports_on_host.return_value = False
-        self._check_get_l3_agent_candidates(
-            router, agent_list, HOST_DVR_SNAT, count=1)
-
-    def test_get_l3_agent_candidates_dvr_ha_snat_no_vms(self):
+    def test_get_l3_agent_candidates_dvr_ha_snat(self):
         self._register_l3_dvr_agents()
-        router = self._make_router(self.fmt,
-                                   tenant_id=uuidutils.generate_uuid(),
-                                   name='r2')
-        router['external_gateway_info'] = None
-        router['id'] = uuidutils.generate_uuid()
-        router['distributed'] = True
+        router = self._fake_router_dict(distributed=True)
         router['ha'] = True
 
         agent_list = [self.l3_dvr_snat_agent]
-        self.check_ports_exist_on_l3agent = mock.Mock(return_value=False)
-        # Test no VMs present case
-        self.check_ports_exist_on_l3agent.return_value = False
-        self.get_subnet_ids_on_router = mock.Mock(return_value=set())
         self._check_get_l3_agent_candidates(
             router, agent_list, HOST_DVR_SNAT, count=1)
 
     def test_get_l3_agent_candidates_centralized(self):
         self._register_l3_dvr_agents()
-        router = self._make_router(self.fmt,
-                                   tenant_id=uuidutils.generate_uuid(),
-                                   name='r2')
-        router['external_gateway_info'] = None
-        router['id'] = uuidutils.generate_uuid()
         # check centralized test case
-        router['distributed'] = False
+        router = self._fake_router_dict()
         agent_list = [self.l3_dvr_snat_agent]
         self._check_get_l3_agent_candidates(router, agent_list, HOST_DVR_SNAT)
 
@@ -650,6 +586,25 @@ class L3SchedulerTestBaseMixin(object):
                                                     admin_state_up=True)
         self.assertEqual([], agents)
 
+    def test_get_l3_agents_hosting_routers_multiple_routers(self):
+        agent = helpers.register_l3_agent('host_6')
+        ctx = self.adminContext
+        router_ids = []
+        for name in ('r1', 'r2'):
+            router = self._make_router(self.fmt,
+                                       tenant_id=uuidutils.generate_uuid(),
+                                       name=name)
+            router_ids.append(router['router']['id'])
+            self.plugin.router_scheduler.bind_router(
+                self.plugin, ctx, router['router']['id'], agent.id)
+        # one agent per binding without a filter, distinct agents with one
+        agents = self.plugin.get_l3_agents_hosting_routers(ctx, router_ids)
+        self.assertEqual([agent.id] * len(router_ids),
+                         [agt.id for agt in agents])
+        agents = self.plugin.get_l3_agents_hosting_routers(
+            ctx, router_ids, admin_state_up=True)
+        self.assertEqual([agent.id], [agt.id for agt in agents])
+
 
 class L3SchedulerTestCaseMixin(test_l3.L3NatTestCaseMixin,
                                L3SchedulerBaseMixin,
@@ -665,9 +620,7 @@ class L3SchedulerTestCaseMixin(test_l3.L3NatTestCaseMixin,
 
         self.adminContext = n_context.get_admin_context()
         self.plugin = directory.get_plugin()
-        self.plugin.router_scheduler = importutils.import_object(
-            'neutron.scheduler.l3_agent_scheduler.ChanceScheduler'
-        )
+        self.plugin.router_scheduler = l3_agent_scheduler.ChanceScheduler()
         self._register_l3_agents()
 
 
@@ -682,12 +635,8 @@ class L3AgentChanceSchedulerTestCase(L3SchedulerTestCaseMixin,
         self.patch_notifier.start()
 
     def test_random_scheduling(self):
-        random_patch = mock.patch('random.choice')
-        random_mock = random_patch.start()
-
-        def side_effect(seq):
-            return seq[0]
-        random_mock.side_effect = side_effect
+        random_mock = mock.patch('random.choice',
+                                 side_effect=lambda seq: seq[0]).start()
 
         with self.subnet() as subnet:
             self._set_net_external(subnet['subnet']['network_id'])
@@ -707,32 +656,30 @@ class L3AgentChanceSchedulerTestCase(L3SchedulerTestCaseMixin,
                     self.assertEqual(len(agents), 1)
                     self.assertEqual(2, random_mock.call_count)
 
-        random_patch.stop()
-
     def test_scheduler_auto_schedule_when_agent_added(self):
         self._set_l3_agent_admin_state(self.adminContext,
                                        self.agent_id1, False)
         self._set_l3_agent_admin_state(self.adminContext,
                                        self.agent_id2, False)
 
-        with self.subnet() as subnet:
-            self._set_net_external(subnet['subnet']['network_id'])
-            with self.router_with_ext_gw(name='r1', subnet=subnet) as r1:
-                agents = self.plugin.get_l3_agents_hosting_routers(
-                    self.adminContext, [r1['router']['id']],
-                    admin_state_up=True)
-                self.assertEqual(0, len(agents))
+        # The agents handle internal only routers, so there is no need to
+        # create an external network and set a gateway on the router.
+        with self.router(name='r1') as r1:
+            agents = self.plugin.get_l3_agents_hosting_routers(
+                self.adminContext, [r1['router']['id']],
+                admin_state_up=True)
+            self.assertEqual(0, len(agents))
 
-                self._set_l3_agent_admin_state(self.adminContext,
-                                               self.agent_id1, True)
-                self.plugin.auto_schedule_routers(self.adminContext,
-                                                  'host_1',
-                                                  [r1['router']['id']])
+            self._set_l3_agent_admin_state(self.adminContext,
+                                           self.agent_id1, True)
+            self.plugin.auto_schedule_routers(self.adminContext,
+                                              'host_1',
+                                              [r1['router']['id']])
 
-                agents = self.plugin.get_l3_agents_hosting_routers(
-                    self.adminContext, [r1['router']['id']],
-                    admin_state_up=True)
-                self.assertEqual('host_1', agents[0]['host'])
+            agents = self.plugin.get_l3_agents_hosting_routers(
+                self.adminContext, [r1['router']['id']],
+                admin_state_up=True)
+            self.assertEqual('host_1', agents[0]['host'])
 
 
 class L3AgentLeastRoutersSchedulerTestCase(L3SchedulerTestCaseMixin,
@@ -741,9 +688,8 @@ class L3AgentLeastRoutersSchedulerTestCase(L3SchedulerTestCaseMixin,
 
     def setUp(self):
         super(L3AgentLeastRoutersSchedulerTestCase, self).setUp()
-        self.plugin.router_scheduler = importutils.import_object(
-            'neutron.scheduler.l3_agent_scheduler.LeastRoutersScheduler'
-        )
+        self.plugin.router_scheduler = (
+            l3_agent_scheduler.LeastRoutersScheduler())
 
     def test_scheduler(self):
         # disable one agent to force the scheduling to the only one.
@@ -800,6 +746,21 @@ class L3DvrSchedulerTestCase(testlib_api.SqlTestCase):
         self.adminContext = n_context.get_admin_context()
         self.dut = L3DvrScheduler()
 
+    @staticmethod
+    def _get_dvr_port(port_id='dvr_port1', router_id='r1',
+                      ip_address='10.10.10.1'):
+        return {
+            'id': port_id,
+            'device_id': router_id,
+            'device_owner': constants.DEVICE_OWNER_DVR_INTERFACE,
+            'fixed_ips': [
+                {
+                    'subnet_id': DVR_SUBNET_ID,
+                    'ip_address': ip_address
+                }
+            ]
+        }
+
     def test__notify_l3_agent_update_port_with_allowed_address_pairs_revert(
             self):
         port_id = uuidutils.generate_uuid()
@@ -1044,25 +1005,24 @@ class L3DvrSchedulerTestCase(testlib_api.SqlTestCase):
         }
         l3plugin = mock.Mock()
         directory.add_plugin(plugin_constants.L3, l3plugin)
-        with mock.patch.object(l3plugin, 'get_dvr_routers_to_remove',
-                               return_value=routers_to_remove),\
-                mock.patch.object(l3plugin, '_get_floatingips_by_port_id',
-                                  return_value=[fip] if fip else []):
-            l3_dvrscheduler_db._notify_l3_agent_port_update(
-                'port', 'after_update', mock.ANY, **kwargs)
-            if routers_to_remove:
-                (l3plugin.l3_rpc_notifier.router_removed_from_agent.
-                 assert_called_once_with(mock.ANY, 'foo_id', source_host))
-                self.assertEqual(
-                    1,
-                    l3plugin.delete_arp_entry_for_dvr_service_port.call_count)
-            if fip and not routers_to_remove:
-                (l3plugin.l3_rpc_notifier.routers_updated_on_host.
-                 assert_called_once_with(mock.ANY, ['router_id'], source_host))
+        l3plugin.get_dvr_routers_to_remove.return_value = routers_to_remove
+        l3plugin._get_floatingips_by_port_id.return_value = (
+            [fip] if fip else [])
+        l3_dvrscheduler_db._notify_l3_agent_port_update(
+            'port', 'after_update', mock.ANY, **kwargs)
+        if routers_to_remove:
+            (l3plugin.l3_rpc_notifier.router_removed_from_agent.
+             assert_called_once_with(mock.ANY, 'foo_id', source_host))
             self.assertEqual(
-                1, l3plugin.update_arp_entry_for_dvr_service_port.call_count)
-            l3plugin.dvr_handle_new_service_port.assert_called_once_with(
-                self.adminContext, kwargs.get('port'), dest_host=None)
+                1,
+                l3plugin.delete_arp_entry_for_dvr_service_port.call_count)
+        if fip and not routers_to_remove:
+            (l3plugin.l3_rpc_notifier.routers_updated_on_host.
+             assert_called_once_with(mock.ANY, ['router_id'], source_host))
+        self.assertEqual(
+            1, l3plugin.update_arp_entry_for_dvr_service_port.call_count)
+        l3plugin.dvr_handle_new_service_port.assert_called_once_with(
+            self.adminContext, kwargs.get('port'), dest_host=None)
 
     def test__notify_l3_agent_update_port_removing_routers(self):
         port_id = 'fake-port'
@@ -1091,25 +1051,22 @@ class L3DvrSchedulerTestCase(testlib_api.SqlTestCase):
             constants.L3_DISTRIBUTED_EXT_ALIAS
         ]
         directory.add_plugin(plugin_constants.L3, l3plugin)
-        with mock.patch.object(l3plugin, 'get_dvr_routers_to_remove',
-                               return_value=[{'agent_id': 'foo_agent',
-                                              'router_id': 'foo_id',
-                                              'host': source_host}]),\
-                mock.patch.object(l3plugin, '_get_floatingips_by_port_id',
-                                  return_value=[]):
-            l3_dvrscheduler_db._notify_l3_agent_port_update(
-                'port', 'after_update', plugin, **kwargs)
+        l3plugin.get_dvr_routers_to_remove.return_value = [
+            {'agent_id': 'foo_agent',
+             'router_id': 'foo_id',
+             'host': source_host}]
+        l3plugin._get_floatingips_by_port_id.return_value = []
+        l3_dvrscheduler_db._notify_l3_agent_port_update(
+            'port', 'after_update', plugin, **kwargs)
 
-            self.assertEqual(
-                1, l3plugin.delete_arp_entry_for_dvr_service_port.call_count)
-            l3plugin.delete_arp_entry_for_dvr_service_port.\
-                assert_called_once_with(
-                    self.adminContext, mock.ANY)
+        l3plugin.delete_arp_entry_for_dvr_service_port.\
+            assert_called_once_with(
+                self.adminContext, mock.ANY)
 
-            self.assertFalse(
-                l3plugin.dvr_handle_new_service_port.called)
-            (l3plugin.l3_rpc_notifier.router_removed_from_agent.
-             assert_called_once_with(mock.ANY, 'foo_id', source_host))
+        self.assertFalse(
+            l3plugin.dvr_handle_new_service_port.called)
+        (l3plugin.l3_rpc_notifier.router_removed_from_agent.
+         assert_called_once_with(mock.ANY, 'foo_id', source_host))
 
     def test__notify_port_delete(self):
         plugin = directory.get_plugin()
@@ -1153,95 +1110,52 @@ class L3DvrSchedulerTestCase(testlib_api.SqlTestCase):
                 portbindings.HOST_ID: 'host1',
                 'fixed_ips': [
                     {
-                        'subnet_id': '80947d4a-fbc8-484b-9f92-623a6bfcf3e0',
+                        'subnet_id': DVR_SUBNET_ID,
                         'ip_address': '10.10.10.3'
                     }
                 ]
         }
         dvr_ports = [
-            {
-                'id': 'dvr_port1',
-                'device_id': 'r1',
-                'device_owner': constants.DEVICE_OWNER_DVR_INTERFACE,
-                'fixed_ips': [
-                    {
-                        'subnet_id': '80947d4a-fbc8-484b-9f92-623a6bfcf3e0',
-                        'ip_address': '10.10.10.1'
-                    }
-                ]
-            },
-            {
-                'id': 'dvr_port2',
-                'device_id': 'r2',
-                'device_owner': constants.DEVICE_OWNER_DVR_INTERFACE,
-                'fixed_ips': [
-                    {
-                        'subnet_id': '80947d4a-fbc8-484b-9f92-623a6bfcf3e0',
-                        'ip_address': '10.10.10.123'
-                    }
-                ]
-            }
+            self._get_dvr_port(),
+            self._get_dvr_port(port_id='dvr_port2', router_id='r2',
+                               ip_address='10.10.10.123')
         ]
         agent_on_host = {'id': 'agent1'}
 
-        with mock.patch(
-            'neutron.db.db_base_plugin_v2.NeutronDbPluginV2' '.get_ports',
-            return_value=dvr_ports),\
-                mock.patch('neutron.api.rpc.agentnotifiers.l3_rpc_agent_api'
-                           '.L3AgentNotifyAPI'),\
-                mock.patch.object(
-                        self.dut, 'get_l3_agents',
-                        return_value=[agent_on_host]) as get_l3_agents:
-            self.dut.dvr_handle_new_service_port(
-                self.adminContext, port)
-
-            get_l3_agents.assert_called_once_with(
-                self.adminContext,
-                filters={'host': [port[portbindings.HOST_ID]]})
-            (self.dut.l3_rpc_notifier.routers_updated_on_host.
-                assert_called_once_with(
-                    self.adminContext, {'r1', 'r2'}, 'host1'))
-            self.assertFalse(self.dut.l3_rpc_notifier.routers_updated.called)
+        mock.patch.object(db_v2.NeutronDbPluginV2, 'get_ports',
+                          return_value=dvr_ports).start()
+        mock.patch('neutron.api.rpc.agentnotifiers.l3_rpc_agent_api'
+                   '.L3AgentNotifyAPI').start()
+        get_l3_agents = mock.patch.object(
+            self.dut, 'get_l3_agents', return_value=[agent_on_host]).start()
+        self.dut.dvr_handle_new_service_port(
+            self.adminContext, port)
+
+        get_l3_agents.assert_called_once_with(
+            self.adminContext,
+            filters={'host': [port[portbindings.HOST_ID]]})
+        (self.dut.l3_rpc_notifier.routers_updated_on_host.
+            assert_called_once_with(
+                self.adminContext, {'r1', 'r2'}, 'host1'))
+        self.assertFalse(self.dut.l3_rpc_notifier.routers_updated.called)
 
     def test_get_dvr_routers_by_subnet_ids(self):
-        subnet_id = '80947d4a-fbc8-484b-9f92-623a6bfcf3e0'
-        dvr_port = {
-                'id': 'dvr_port1',
-                'device_id': 'r1',
-                'device_owner': constants.DEVICE_OWNER_DVR_INTERFACE,
-                'fixed_ips': [
-                    {
-                        'subnet_id': subnet_id,
-                        'ip_address': '10.10.10.1'
-                    }
-                ]
-        }
+        dvr_port = self._get_dvr_port()
         r1 = {
               'id': 'r1',
               'distributed': True,
         }
 
-        with mock.patch(
-            'neutron.db.db_base_plugin_v2.NeutronDbPluginV2' '.get_port',
-            return_value=dvr_port),\
-                mock.patch('neutron.db.db_base_plugin_v2.NeutronDbPluginV2'
-                           '.get_ports', return_value=[dvr_port]):
-            router_id = self.dut.get_dvr_routers_by_subnet_ids(
-                self.adminContext, [subnet_id])
-            self.assertEqual(r1['id'], router_id.pop())
+        mock.patch.object(db_v2.NeutronDbPluginV2, 'get_port',
+                          return_value=dvr_port).start()
+        mock.patch.object(db_v2.NeutronDbPluginV2, 'get_ports',
+                          return_value=[dvr_port]).start()
+        router_id = self.dut.get_dvr_routers_by_subnet_ids(
+            self.adminContext, [DVR_SUBNET_ID])
+        self.assertEqual(r1['id'], router_id.pop())
 
     def test_get_subnet_ids_on_router(self):
-        dvr_port = {
-                'id': 'dvr_port1',
-                'device_id': 'r1',
-                'device_owner': constants.DEVICE_OWNER_DVR_INTERFACE,
-                'fixed_ips': [
-                    {
-                        'subnet_id': '80947d4a-fbc8-484b-9f92-623a6bfcf3e0',
-                        'ip_address': '10.10.10.1'
-                    }
-                ]
-        }
+        dvr_port = self._get_dvr_port()
         r1 = {
               'id': 'r1',
               'distributed': True,
@@ -1256,12 +1170,8 @@ class L3DvrSchedulerTestCase(testlib_api.SqlTestCase):
                             dvr_port.get('fixed_ips').pop(0).get('subnet_id'))
 
     def test_get_subnet_ids_on_router_no_subnet(self):
-        dvr_port = {
-                'id': 'dvr_port1',
-                'device_id': 'r1',
-                'device_owner': constants.DEVICE_OWNER_DVR_INTERFACE,
-                'fixed_ips': []
-        }
+        dvr_port = self._get_dvr_port()
+        dvr_port['fixed_ips'] = []
         r1 = {
               'id': 'r1',
               'distributed': True,
@@ -1272,20 +1182,6 @@ class L3DvrSchedulerTestCase(testlib_api.SqlTestCase):
                                                         r1['id'])
             self.assertEqual(0, len(sub_ids))
 
-    def _prepare_schedule_snat_tests(self):
-        agent = agent_model.Agent()
-        agent.admin_state_up = True
-        agent.heartbeat_timestamp = timeutils.utcnow()
-        router = {
-            'id': 'foo_router_id',
-            'distributed': True,
-            'external_gateway_info': {
-                'network_id': uuidutils.generate_uuid(),
-                'enable_snat': True
-            }
-        }
-        return agent, router
-
 
 class L3HAPlugin(db_v2.NeutronDbPluginV2,
                  l3_hamode_db.L3_HA_NAT_db_mixin,
@@ -1318,9 +1214,7 @@ class L3HATestCaseMixin(testlib_api.SqlTestCase,
 
         manager.init()
         self.plugin = directory.get_plugin(plugin_constants.L3)
-        self.plugin.router_scheduler = importutils.import_object(
-            'neutron.scheduler.l3_agent_scheduler.ChanceScheduler'
-        )
+        self.plugin.router_scheduler = l3_agent_scheduler.ChanceScheduler()
         self._register_l3_agents()
 
     @staticmethod
@@ -1773,19 +1667,16 @@ class L3HALeastRoutersSchedulerTestCase(L3HATestCaseMixin):
 
     def setUp(self):
         super(L3HALeastRoutersSchedulerTestCase, self).setUp()
-        self.plugin.router_scheduler = importutils.import_object(
-            'neutron.scheduler.l3_agent_scheduler.LeastRoutersScheduler'
-        )
+        self.plugin.router_scheduler = (
+            l3_agent_scheduler.LeastRoutersScheduler())
 
     def test_scheduler(self):
         cfg.CONF.set_override('max_l3_agents_per_router', 2)
 
         # disable the third agent to be sure that the router will
         # be scheduled of the two firsts
-        self._set_l3_agent_admin_state(self.adminContext,
-                                       self.agent_id3, False)
-        self._set_l3_agent_admin_state(self.adminContext,
-                                       self.agent_id4, False)
+        self._set_l3_agents_admin_state(
+            self.adminContext, [self.agent_id3, self.agent_id4], False)
 
         r1 = self._create_ha_router()
         agents = self.plugin.get_l3_agents_hosting_routers(
@@ -1796,10 +1687,8 @@ class L3HALeastRoutersSchedulerTestCase(L3HATestCaseMixin):
         self.assertIn(self.agent_id1, agent_ids)
         self.assertIn(self.agent_id2, agent_ids)
 
-        self._set_l3_agent_admin_state(self.adminContext,
-                                       self.agent_id3, True)
-        self._set_l3_agent_admin_state(self.adminContext,
-                                       self.agent_id4, True)
+        self._set_l3_agents_admin_state(
+            self.adminContext, [self.agent_id3, self.agent_id4], True)
 
         r2 = self._create_ha_router()
         agents = self.plugin.get_l3_agents_hosting_routers(
@@ -1889,8 +1778,8 @@ class L3AgentAZLeastRoutersSchedulerTestCase(L3HATestCaseMixin):
 
     def setUp(self):
         super(L3AgentAZLeastRoutersSchedulerTestCase, self).setUp()
-        self.plugin.router_scheduler = importutils.import_object(
-            'neutron.scheduler.l3_agent_scheduler.AZLeastRoutersScheduler')
+        self.plugin.router_scheduler = (
+            l3_agent_scheduler.AZLeastRoutersScheduler())
         # Mock scheduling so that the test can control it explicitly
         mock.patch.object(l3_hamode_db.L3_HA_NAT_db_mixin,
                           '_notify_router_updated').start()
@@ -18,8 +18,10 @@ from neutron_lib import context
 from neutron_lib import exceptions as lib_exc
 from neutron_lib.plugins import directory
 from oslo_utils import uuidutils
+import testscenarios
 import testtools
 
+from neutron.db.models import l3 as l3_models
 from neutron.plugins.common import constants as p_cons
 from neutron.services.l3_router.service_providers import driver_controller
 from neutron.services import provider_configuration
@@ -27,29 +29,34 @@ from neutron.tests import base
 from neutron.tests.unit import testlib_api
 
 
+# Required to generate tests from scenarios. Not compatible with nose.
+load_tests = testscenarios.load_tests_apply_scenarios
+
 DB_PLUGIN_KLASS = 'neutron.db.db_base_plugin_v2.NeutronDbPluginV2'
 
 
-class TestDriverController(testlib_api.SqlTestCase):
+class TestDriverControllerBase(testlib_api.SqlTestCase):
 
     def setUp(self):
-        super(TestDriverController, self).setUp()
+        super(TestDriverControllerBase, self).setUp()
         self.setup_coreplugin(DB_PLUGIN_KLASS)
         self.fake_l3 = mock.Mock()
         self.dc = driver_controller.DriverController(self.fake_l3)
         self.fake_l3.l3_driver_controller = self.dc
         self.ctx = context.get_admin_context()
 
+
+class TestDriverController(TestDriverControllerBase):
+
     def _return_provider_for_flavor(self, provider):
-        self.dc._flavor_plugin_ref = mock.Mock()
-        self.dc._flavor_plugin_ref.get_flavor.return_value = {'id': 'abc'}
-        provider = {'provider': provider}
-        self.dc._flavor_plugin_ref.get_flavor_next_provider.return_value = [
-            provider]
+        self.dc._flavor_plugin_ref = mock.Mock(**{
+            'get_flavor.return_value': {'id': 'abc'},
+            'get_flavor_next_provider.return_value': [
+                {'provider': provider}]})
 
     def test_uses_scheduler(self):
         self._return_provider_for_flavor('dvrha')
-        router_db = mock.Mock()
+        router_db = l3_models.Router()
         flavor_id = uuidutils.generate_uuid()
         router_id = uuidutils.generate_uuid()
         router = dict(id=router_id, flavor_id=flavor_id)
@@ -61,7 +68,7 @@ class TestDriverController(testlib_api.SqlTestCase):
 
     def test_driver_owns_router(self):
         self._return_provider_for_flavor('dvrha')
-        router_db = mock.Mock()
+        router_db = l3_models.Router()
         flavor_id = uuidutils.generate_uuid()
         r1 = uuidutils.generate_uuid()
         r2 = uuidutils.generate_uuid()
@@ -75,7 +82,7 @@ class TestDriverController(testlib_api.SqlTestCase):
 
     def test__set_router_provider_flavor_specified(self):
         self._return_provider_for_flavor('dvrha')
-        router_db = mock.Mock()
+        router_db = l3_models.Router()
         flavor_id = uuidutils.generate_uuid()
         router_id = uuidutils.generate_uuid()
         router = dict(id=router_id, flavor_id=flavor_id)
@@ -101,43 +108,6 @@ class TestDriverController(testlib_api.SqlTestCase):
                     None, {'name': 'testname'},
                     {'flavor_id': 'old_fid'}, None)
 
-    def test__set_router_provider_attr_lookups(self):
-        # ensure correct drivers are looked up based on attrs
-        router_id1 = uuidutils.generate_uuid()
-        router_id2 = uuidutils.generate_uuid()
-        router_id3 = uuidutils.generate_uuid()
-        router_id4 = uuidutils.generate_uuid()
-        router_id5 = uuidutils.generate_uuid()
-        router_id6 = uuidutils.generate_uuid()
-        router_id7 = uuidutils.generate_uuid()
-        router_id8 = uuidutils.generate_uuid()
-        router_id9 = uuidutils.generate_uuid()
-        cases = [
-            ('dvrha', dict(id=router_id1, distributed=True, ha=True)),
-            ('dvr', dict(id=router_id2, distributed=True, ha=False)),
-            ('ha', dict(id=router_id3, distributed=False, ha=True)),
-            ('single_node', dict(id=router_id4, distributed=False,
-                                 ha=False)),
-            ('ha', dict(id=router_id5, ha=True,
-                        distributed=constants.ATTR_NOT_SPECIFIED)),
-            ('dvr', dict(id=router_id6, distributed=True,
-                        ha=constants.ATTR_NOT_SPECIFIED)),
-            ('single_node', dict(id=router_id7, ha=False,
-                                 distributed=constants.ATTR_NOT_SPECIFIED)),
-            ('single_node', dict(id=router_id8, distributed=False,
-                                 ha=constants.ATTR_NOT_SPECIFIED)),
-            ('single_node', dict(id=router_id9,
-                                 distributed=constants.ATTR_NOT_SPECIFIED,
-                                 ha=constants.ATTR_NOT_SPECIFIED)),
-        ]
-        for driver, body in cases:
-            self.dc._set_router_provider('router', 'PRECOMMIT_CREATE', self,
-                                         self.ctx, body, mock.Mock())
-            self.assertEqual(self.dc.drivers[driver],
-                             self.dc.get_provider_for_router(self.ctx,
-                                                             body['id']),
-                             'Expecting %s for body %s' % (driver, body))
-
     def test__clear_router_provider(self):
         # ensure correct drivers are looked up based on attrs
         router_id1 = uuidutils.generate_uuid()
@@ -161,6 +131,61 @@ class TestDriverController(testlib_api.SqlTestCase):
             directory.get_plugin(p_cons.FLAVORS), _dc._flavor_plugin)
 
 
+class TestDriverControllerAttrLookups(TestDriverControllerBase):
+    """Ensure correct drivers are looked up based on router attrs."""
+
+    scenarios = [
+        ('dvrha',
+            dict(driver='dvrha',
+                 body=dict(distributed=True, ha=True))),
+
+        ('dvr',
+            dict(driver='dvr',
+                 body=dict(distributed=True, ha=False))),
+
+        ('ha',
+            dict(driver='ha',
+                 body=dict(distributed=False, ha=True))),
+
+        ('single_node',
+            dict(driver='single_node',
+                 body=dict(distributed=False, ha=False))),
+
+        ('ha, distributed not specified',
+            dict(driver='ha',
+                 body=dict(ha=True,
+                           distributed=constants.ATTR_NOT_SPECIFIED))),
+
+        ('dvr, ha not specified',
+            dict(driver='dvr',
+                 body=dict(distributed=True,
+                           ha=constants.ATTR_NOT_SPECIFIED))),
+
+        ('single_node, distributed not specified',
+            dict(driver='single_node',
+                 body=dict(ha=False,
+                           distributed=constants.ATTR_NOT_SPECIFIED))),
+
+        ('single_node, ha not specified',
+            dict(driver='single_node',
+                 body=dict(distributed=False,
+                           ha=constants.ATTR_NOT_SPECIFIED))),
+
+        ('single_node, nothing specified',
+            dict(driver='single_node',
+                 body=dict(distributed=constants.ATTR_NOT_SPECIFIED,
+                           ha=constants.ATTR_NOT_SPECIFIED))),
+    ]
+
+    def test__set_router_provider_attr_lookups(self):
+        body = dict(self.body, id=uuidutils.generate_uuid())
+        self.dc._set_router_provider('router', 'PRECOMMIT_CREATE', self,
+                                     self.ctx, body, mock.Mock())
+        self.assertEqual(self.dc.drivers[self.driver],
+                         self.dc.get_provider_for_router(self.ctx,
+                                                         body['id']))
+
+
 class Test_LegacyPlusProviderConfiguration(base.BaseTestCase):
 
     @mock.patch.object(provider_configuration.ProviderConfiguration,